@@ -3,11 +3,12 @@
 # Created for TagStudio: https://github.com/CyanVoxel/TagStudio
 
 
-from pathlib import Path
+from functools import cache
+from pathlib import Path, PurePath
 
 import structlog
-from sqlalchemy import Dialect, Engine, String, TypeDecorator, create_engine, text
-from sqlalchemy.exc import OperationalError
+from sqlalchemy import Connection, Dialect, Engine, String, TypeDecorator, create_engine, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import DeclarativeBase
 
 from tagstudio.core.constants import RESERVED_TAG_END
@@ -19,10 +20,13 @@ class PathType(TypeDecorator):
     impl = String
     cache_ok = True
 
-    def process_bind_param(self, value: Path, dialect: Dialect):
-        if value is not None:
-            return Path(value).as_posix()
-        return None
+    def process_bind_param(self, value: Path | str, dialect: Dialect):
+        if value is None:
+            return None
+        # Path values are already parsed, only strings need normalizing through Path.
+        if isinstance(value, PurePath):
+            return value.as_posix()
+        return Path(value).as_posix()
 
     def process_result_value(self, value: str, dialect: Dialect):
         if value is not None:
@@ -34,29 +38,142 @@ class Base(DeclarativeBase):
     type_annotation_map = {Path: PathType}
 
 
-def make_engine(connection_string: str) -> Engine:
-    return create_engine(connection_string)
+# Fast executemany options for psycopg2, batching multi-row INSERT/UPDATE/DELETE statements
+# into as few server round-trips as possible.
+POSTGRES_ENGINE_OPTIONS = {
+    "executemany_mode": "values_plus_batch",
+    "insertmanyvalues_page_size": 1000,
+    "executemany_batch_page_size": 500,
+}
+
+
+def make_engine(connection_string: str, **kwargs) -> Engine:
+    if str(connection_string).startswith("postgresql"):
+        kwargs = {**POSTGRES_ENGINE_OPTIONS, **kwargs}
+    return create_engine(connection_string, **kwargs)
+
+
+# Indexes shared by all dialects, keyed by index name.
+SEARCH_INDEXES = {
+    "idx_entries_suffix": "CREATE INDEX IF NOT EXISTS idx_entries_suffix ON entries (suffix)",
+}
+
+# Trigram indexes answering the substring (ILIKE '%foo%') filters used by path and tag
+# searches on PostgreSQL, which plain B-tree indexes cannot serve.
+POSTGRES_SEARCH_INDEXES = {
+    "idx_entries_path_trgm": (
+        "CREATE INDEX idx_entries_path_trgm ON entries USING gin (path gin_trgm_ops)"
+    ),
+    "idx_tags_name_trgm": "CREATE INDEX idx_tags_name_trgm ON tags USING gin (name gin_trgm_ops)",
+    "idx_tags_shorthand_trgm": (
+        "CREATE INDEX idx_tags_shorthand_trgm ON tags USING gin (shorthand gin_trgm_ops)"
+    ),
+    "idx_tag_aliases_name_trgm": (
+        "CREATE INDEX idx_tag_aliases_name_trgm ON tag_aliases USING gin (name gin_trgm_ops)"
+    ),
+}
+
+# pg_trgm is a trusted extension, so any role with CREATE on the database may install it.
+PG_TRGM_CREATABLE = text(
+    "SELECT has_database_privilege(current_database(), 'CREATE') "
+    "AND EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm')"
+)
+
+
+@cache
+def _warn_missing_pg_trgm(url: str) -> None:
+    logger.warning(
+        "[Library] pg_trgm is not available, substring searches will not use trigram indexes",
+        url=url,
+    )
+
+
+def _has_pg_trgm(conn: Connection) -> bool:
+    """Return whether pg_trgm is installed, installing it if the role is allowed to."""
+    if conn.scalar(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")):
+        return True
+    if not conn.scalar(PG_TRGM_CREATABLE):
+        return False
+    conn.execute(text("CREATE EXTENSION pg_trgm"))
+    return True
+
+
+def make_search_indexes(engine: Engine) -> None:
+    """Create the indexes used by library searches.
+
+    On PostgreSQL only missing indexes are created, so reopening a library issues no DDL.
+    On an existing library the indexes are built once, on the first open after upgrading,
+    and writes to the indexed tables wait until the build finishes.
+    """
+    if engine.dialect.name != "postgresql":
+        try:
+            with engine.begin() as conn:
+                for statement in SEARCH_INDEXES.values():
+                    conn.execute(text(statement))
+        except DBAPIError as e:
+            logger.error("[Library] Could not create search indexes", error=e)
+        return
+
+    try:
+        with engine.begin() as conn:
+            existing = set(
+                conn.scalars(
+                    text("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()")
+                )
+            )
+            for name, statement in SEARCH_INDEXES.items():
+                if name not in existing:
+                    conn.execute(text(statement))
+
+        missing = [
+            statement for name, statement in POSTGRES_SEARCH_INDEXES.items() if name not in existing
+        ]
+        if not missing:
+            return
+
+        with engine.begin() as conn:
+            if not _has_pg_trgm(conn):
+                _warn_missing_pg_trgm(str(engine.url))
+                return
+            for statement in missing:
+                conn.execute(text(statement))
+    except DBAPIError as e:
+        logger.warning("[Library] Could not create search indexes", error=e)
 
 
 def make_tables(engine: Engine) -> None:
     logger.info("[Library] Creating DB tables...")
     Base.metadata.create_all(engine)
-
-    # tag IDs < 1000 are reserved
-    # create tag and delete it to bump the autoincrement sequence
-    # TODO - find a better way
-    # is this the better way?
-    with engine.connect() as conn:
-        try:
-            conn.execute(
-                text(
-                    f"ALTER SEQUENCE tags_id_seq RESTART WITH {RESERVED_TAG_END + 1}"
+    make_search_indexes(engine)
+
+    # tag IDs < 1000 are reserved, so user-created tags must start after RESERVED_TAG_END.
+    # Never move the counter backwards past tags that already exist.
+    try:
+        with engine.begin() as conn:
+            if engine.dialect.name == "postgresql":
+                conn.execute(
+                    text(
+                        "SELECT setval('tags_id_seq', "
+                        "GREATEST((SELECT COALESCE(MAX(id), 0) FROM tags), :seq))"
+                    ),
+                    {"seq": RESERVED_TAG_END},
                 )
-            )
-            conn.commit()
-        except OperationalError as e:
-            logger.error("Could not initialize built-in tags", error=e)
-            conn.rollback()
+            elif engine.dialect.name == "sqlite":
+                seq = conn.execute(
+                    text("SELECT seq FROM sqlite_sequence WHERE name = 'tags'")
+                ).scalar()
+                if seq is None:
+                    conn.execute(
+                        text("INSERT INTO sqlite_sequence (name, seq) VALUES ('tags', :seq)"),
+                        {"seq": RESERVED_TAG_END},
+                    )
+                elif seq < RESERVED_TAG_END:
+                    conn.execute(
+                        text("UPDATE sqlite_sequence SET seq = :seq WHERE name = 'tags'"),
+                        {"seq": RESERVED_TAG_END},
+                    )
+    except DBAPIError as e:
+        logger.error("Could not initialize built-in tags", error=e)
 
 
 def drop_tables(engine: Engine) -> None:
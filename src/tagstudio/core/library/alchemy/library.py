@@ -25,6 +25,7 @@ from sqlalchemy import (
     Engine,
     NullPool,
     ScalarResult,
+    String,
     and_,
     asc,
     create_engine,
@@ -32,9 +33,12 @@ from sqlalchemy import (
     desc,
     exists,
     func,
+    insert,
+    inspect,
     or_,
     select,
     text,
+    type_coerce,
     update,
 )
 from sqlalchemy.exc import IntegrityError
@@ -59,7 +63,7 @@ from tagstudio.core.constants import (
 )
 from tagstudio.core.enums import LibraryPrefs
 from tagstudio.core.library.alchemy import default_color_groups
-from tagstudio.core.library.alchemy.db import make_tables
+from tagstudio.core.library.alchemy.db import make_engine, make_tables
 from tagstudio.core.library.alchemy.enums import (
     MAX_SQL_VARIABLES,
     BrowsingState,
@@ -375,7 +379,7 @@ class Library:
             library_dir=library_dir,
             connection_string=connection_string,
         )
-        self.engine = create_engine(connection_string)
+        self.engine = make_engine(connection_string)
         with Session(self.engine) as session:
             if not is_new:
                 db_result = session.scalar(
@@ -835,6 +839,18 @@ class Library:
             entries = dict((e.id, e) for e in session.scalars(statement))
             return [entries[id] for id in entry_ids]
 
+    def get_entries_by_suffix(self, suffixes: Iterable[str]) -> Iterator[tuple[int, str, str]]:
+        """Yield (id, path, suffix) rows for entries with the given suffixes.
+
+        Rows come straight from the query without building Entry objects, and paths are
+        returned as raw POSIX strings.
+        """
+        with Session(self.engine) as session:
+            statement = select(Entry.id, type_coerce(Entry.path, String), Entry.suffix).where(
+                Entry.suffix.in_(sorted(suffixes))
+            )
+            yield from session.execute(statement)
+
     def get_entries_full(self, entry_ids: list[int] | set[int]) -> Iterator[Entry]:
         """Load entry and join with all joins and all tags."""
         with Session(self.engine) as session:
@@ -977,14 +993,53 @@ class Library:
             # add all items
 
             try:
-                session.add_all(items)
-                session.commit()
+                # The ORM is still needed for explicit IDs, fields, tags, or a folder that
+                # has not been flushed yet (it is inserted by cascade from its entries).
+                folder_ids = [
+                    inspect(item.folder).identity if item.folder is not None else None
+                    for item in items
+                ]
+                if any(
+                    item.id is not None
+                    or folder_id is None
+                    or item.text_fields
+                    or item.datetime_fields
+                    or item.tags
+                    for item, folder_id in zip(items, folder_ids, strict=True)
+                ):
+                    session.add_all(items)
+                    session.commit()
+                    new_ids = [item.id for item in items]
+                else:
+                    # Plain new entries (e.g. from a directory scan) skip the ORM unit of work.
+                    # PostgreSQL batches them into multi-row INSERT ... RETURNING statements;
+                    # SQLite runs one INSERT ... RETURNING per row to keep the IDs in order,
+                    # which is still much cheaper than an ORM flush.
+                    new_ids = list(
+                        session.scalars(
+                            insert(Entry).returning(Entry.id, sort_by_parameter_order=True),
+                            [
+                                {
+                                    "folder_id": folder_id[0],
+                                    "path": item.path,
+                                    "filename": item.filename,
+                                    "suffix": item.suffix,
+                                    "date_created": item.date_created,
+                                    "date_modified": item.date_modified,
+                                    "date_added": item.date_added,
+                                }
+                                for item, folder_id in zip(items, folder_ids, strict=True)
+                            ],
+                        ).all()
+                    )
+                    session.commit()
+                    for item, new_id in zip(items, new_ids, strict=True):
+                        item.id = new_id
             except IntegrityError:
                 session.rollback()
                 logger.error("IntegrityError")
                 return []
 
-            new_ids = [item.id for item in items]
             session.expunge_all()
 
         return new_ids
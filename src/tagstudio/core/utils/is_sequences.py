@@ -10,24 +10,78 @@ library_path должен указывать на путь к библиотек
 import re
 from collections import defaultdict
 from pathlib import Path
+from typing import NamedTuple
 
 from sqlalchemy.orm import Session
-from sqlalchemy import update, text, inspect
+from sqlalchemy import inspect, text, update
 
+from tagstudio.core.library.alchemy.enums import MAX_SQL_VARIABLES
 from tagstudio.core.library.alchemy.models import Entry
 from tagstudio.core.library.alchemy.library import Library
 
-SEQUENCE_EXTENSIONS = {"dpx", "exr", "jpg", "jpeg", "png", "tif", "tiff", "ari", "tga"}
-SEQUENCE_RE = re.compile(r"^(.*?)(?:[._-]?)(\d{3,6})$")
+# Entry.suffix хранится в нижнем регистре и без точки, поэтому .lower() не нужен
+SEQUENCE_EXTENSIONS = frozenset({"ari", "dpx", "exr", "jpeg", "jpg", "png", "tga", "tif", "tiff"})
+# Номер кадра — 3-6 цифр ASCII в конце имени, как и [0-9] в SEQUENCE_GROUPS_QUERY.
+# Правила разбора заданы трижды: SEQUENCE_RE, _split_frame и SEQUENCE_GROUPS_QUERY.
+# Менять их нужно вместе; соответствие SEQUENCE_RE и _split_frame проверяют тесты.
+SEQUENCE_RE = re.compile(r"^(.*?)(?:[._-]?)([0-9]{3,6})$")
+
+# Та же группировка, что и в SEQUENCE_RE, но на стороне PostgreSQL:
+# ключ (папка, база имени, расширение), кадры упорядочены по пути.
+SEQUENCE_GROUPS_QUERY = text("""
+SELECT array_agg(id ORDER BY path COLLATE "C") AS ids,
+       array_agg(path ORDER BY path COLLATE "C") AS paths
+FROM (
+    SELECT id,
+           path,
+           suffix,
+           regexp_replace(path, '/?[^/]*$', '') AS parent,
+           regexp_replace(filename, '[.][^.]*$', '') AS stem
+    FROM entries
+    WHERE suffix = ANY(:exts)
+) e
+WHERE stem ~ '[0-9]{3,6}$'
+GROUP BY parent, regexp_replace(stem, '[._-]?[0-9]{3,6}$', ''), suffix
+HAVING count(*) > 1
+""")
+
+
+def _split_frame(stem: str):
+    """Делит имя кадра на (база, номер) так же, как SEQUENCE_RE.match, но без регулярки.
+
+    Возвращает None, если имя не заканчивается номером кадра из 3-6 цифр.
+    Правила должны совпадать с SEQUENCE_RE и SEQUENCE_GROUPS_QUERY.
+    """
+    # Обратный проход по хвосту из цифр
+    i = len(stem)
+    while i and "0" <= stem[i - 1] <= "9":
+        i -= 1
+    digits = len(stem) - i
+    if digits < 3:
+        return None
+    if digits > 6:
+        # Номер кадра — последние 6 цифр, остальные цифры остаются в базе
+        return stem[:-6], stem[-6:]
+    frame = stem[i:]
+    if i and stem[i - 1] in "._-":
+        i -= 1
+    return stem[:i], frame
+
+
+class SequenceFrame(NamedTuple):
+    id: int
+    path: str
 
 
 class SequenceEntry:
-    def __init__(self):
-        self.entries = []
+    """Кадры секвенции, упорядоченные по пути: первый кадр — постер."""
+
+    def __init__(self, entries=None):
+        self.entries = entries if entries is not None else []
 
     @property
     def poster(self):
-        return min(self.entries, key=lambda e: e.path) if self.entries else None
+        return self.entries[0] if self.entries else None
 
     @property
     def frame_count(self):
@@ -41,27 +95,41 @@ class SequenceRegistry:
         self.entry_to_sequence = {}
 
     def refresh_sequences(self):
+        self.sequences.clear()
+        self.entry_to_sequence.clear()
+
+        if self.library.engine.dialect.name == "postgresql":
+            sequences = self._sequences_from_sql()
+        else:
+            sequences = self._sequences_from_entries()
+
+        for new_seq in sequences:
+            self.sequences.append(new_seq)
+            for e in new_seq.entries:
+                self.entry_to_sequence[e.id] = new_seq
+
+    def _sequences_from_sql(self):
+        """Группирует кадры одним запросом на стороне PostgreSQL."""
+        with Session(self.library.engine) as session:
+            rows = session.execute(SEQUENCE_GROUPS_QUERY, {"exts": sorted(SEQUENCE_EXTENSIONS)})
+            for ids, paths in rows:
+                frames = zip(ids, paths, strict=True)
+                yield SequenceEntry([SequenceFrame(*frame) for frame in frames])
+
+    def _sequences_from_entries(self):
         groups = defaultdict(SequenceEntry)
 
-        for entry in self.library.get_entries():
-            if entry.suffix.lower() not in SEQUENCE_EXTENSIONS:
-                continue
-
-            match = SEQUENCE_RE.match(entry.path.stem)
-            if match:
-                base = match.group(1)
-                key = (entry.path.parent, base, entry.suffix)
-                groups[key].entries.append(entry)
+        # Берём сырые строки путей без сборки ORM-объектов и Path,
+        # расширения фильтруются на стороне БД (idx_entries_suffix).
+        for entry_id, path, suffix in self.library.get_entries_by_suffix(SEQUENCE_EXTENSIONS):
+            parent, _, name = path.rpartition("/")
+            split = _split_frame(name.rpartition(".")[0] or name)
+            if split:
+                groups[(parent, split[0], suffix)].entries.append(SequenceFrame(entry_id, path))
 
-        self.sequences.clear()
         for seq in groups.values():
             if len(seq.entries) > 1:
-                sorted_entries = sorted(seq.entries, key=lambda e: e.path)
-                new_seq = SequenceEntry()
-                new_seq.entries = sorted_entries
-                self.sequences.append(new_seq)
-                for e in sorted_entries:
-                    self.entry_to_sequence[e.id] = new_seq
+                yield SequenceEntry(sorted(seq.entries, key=lambda e: e.path))
 
 
 def ensure_is_sequence_column(library: Library):
@@ -86,22 +154,37 @@ def update_sequences(library: Library):
 
     registry = SequenceRegistry(library)
     registry.refresh_sequences()
-    with Session(library.engine) as session:
-        session.execute(update(Entry).values(is_sequence=False))
-        session.commit()
-
-        updated_count = 0
-        for seq in registry.sequences:
-            for i, entry in enumerate(seq.entries):
-                session.execute(
+
+    # Помечаем одним запросом все кадры секвенций, кроме постера (первого кадра)
+    non_poster_ids = [e.id for seq in registry.sequences for e in seq.entries[1:]]
+    updated_count = sum(seq.frame_count for seq in registry.sequences)
+
+    # Core-соединение: без identity map и autoflush ORM-сессии, коммит при выходе из блока
+    with library.engine.begin() as conn:
+        if library.engine.dialect.name == "postgresql":
+            # Один параметр-массив вместо IN (...) с N плейсхолдерами
+            conn.execute(
+                text(
+                    "UPDATE entries SET is_sequence = false "
+                    "WHERE is_sequence AND NOT (id = ANY(:ids))"
+                ),
+                {"ids": non_poster_ids},
+            )
+            conn.execute(
+                text(
+                    "UPDATE entries SET is_sequence = true WHERE id = ANY(:ids) AND NOT is_sequence"
+                ),
+                {"ids": non_poster_ids},
+            )
+        else:
+            conn.execute(update(Entry).where(Entry.is_sequence.is_(True)).values(is_sequence=False))
+            for i in range(0, len(non_poster_ids), MAX_SQL_VARIABLES):
+                conn.execute(
                     update(Entry)
-                    .where(Entry.id == entry.id)
-                    .values(is_sequence=(i != 0))
+                    .where(Entry.id.in_(non_poster_ids[i : i + MAX_SQL_VARIABLES]))
+                    .values(is_sequence=True)
                 )
 
-                updated_count += 1
-        session.commit()
-
     print(f"[OK] Обновлено {len(registry.sequences)} секвенций, {updated_count} файлов")
 
 
@@ -116,111 +199,3 @@ if __name__ == "__main__":
     else:
         update_sequences(lib)
         lib.close()
-
-
-
-
-"""
-Этот закомментированный код использовать, если раскомментированный код не работает.
-Но с ним нужно будет вручную добавить в таблицу entries колонку is_sequence.
-tagstudio_db=# ALTER TABLE entries ADD COLUMN is_sequence BOOLEAN DEFAULT FALSE NOT NULL;
-Хотя существующий код протестирован и работает.
-"""
-
-
-
-
-# #!/usr/bin/env python3
-# import re
-# from collections import defaultdict
-# from pathlib import Path
-# from sqlalchemy.orm import Session
-# from sqlalchemy import update
-
-# from tagstudio.core.library.alchemy.models import Entry
-# from tagstudio.core.library.alchemy.library import Library
-
-# SEQUENCE_EXTENSIONS = {"dpx", "exr", "jpg", "jpeg", "png", "tif", "tiff"}
-
-# SEQUENCE_RE = re.compile(r"^(.*?)(?:[._-]?)(\d{3,6})$")
-
-
-# class SequenceEntry:
-#     def __init__(self):
-#         self.entries = []
-
-#     @property
-#     def poster(self):
-#         return min(self.entries, key=lambda e: e.path) if self.entries else None
-
-#     @property
-#     def frame_count(self):
-#         return len(self.entries)
-
-
-# class SequenceRegistry:
-#     def __init__(self, library: Library):
-#         self.library = library
-#         self.sequences = []
-#         self.entry_to_sequence = {}
-
-#     def refresh_sequences(self):
-#         groups = defaultdict(SequenceEntry)
-#         print(1)
-#         for entry in self.library.get_entries():
-#             if entry.suffix.lower() not in SEQUENCE_EXTENSIONS:
-#                 continue
-
-#             match = SEQUENCE_RE.match(entry.path.stem)
-#             if match:
-#                 base = match.group(1)
-#                 key = (entry.path.parent, base, entry.suffix)
-#                 groups[key].entries.append(entry)
-#         print(2)
-#         self.sequences.clear()
-#         for seq in groups.values():
-#             if len(seq.entries) > 1:
-#                 sorted_entries = sorted(seq.entries, key=lambda e: e.path)
-#                 new_seq = SequenceEntry()
-#                 new_seq.entries = sorted_entries
-#                 self.sequences.append(new_seq)
-#                 for e in sorted_entries:
-#                     self.entry_to_sequence[e.id] = new_seq
-        
-
-
-# def update_sequences(library: Library):
-#     registry = SequenceRegistry(library)
-#     registry.refresh_sequences()
-#     print(3)
-#     with Session(library.engine) as session:
-#         session.execute(update(Entry).values(is_sequence=False))
-#         session.commit()
-
-#         updated_count = 0
-#         for seq in registry.sequences:
-#             for i, entry in enumerate(seq.entries):
-#                 session.execute(
-#                     update(Entry)
-#                     .where(Entry.id == entry.id)
-#                     .values(is_sequence=(i != 0))
-#                 )
-#                 updated_count += 1
-#         session.commit()
-
-#     print(f"[OK] Обновлено {len(registry.sequences)} секвенций, {updated_count} файлов")
-
-
-# if __name__ == "__main__":
-#     # library_path = Path("/home/timur/Dev/library_tagstudio_test")
-#     library_path = Path("/studio/stock")
-
-
-#     lib = Library()
-#     status = lib.open_library(library_path)
-
-#     if not status.success:
-#         print("[ERROR] Не удалось открыть библиотеку:", status.message or "Неизвестная ошибка")
-#     else:
-#         update_sequences(lib)
-#         lib.close()
@@ -1,9 +1,12 @@
 import sys
+from collections.abc import Iterator
 from pathlib import Path
 from tempfile import TemporaryDirectory
 from unittest.mock import Mock, patch
+from uuid import uuid4
 
 import pytest
+from sqlalchemy import create_engine, make_url, text
 
 CWD = Path(__file__).parent
 # this needs to be above `src` imports
@@ -124,6 +127,20 @@ def library(request, library_dir: Path):
     yield lib
 
 
+@pytest.fixture
+def postgres_storage() -> Iterator[str]:
+    """Connection string for a throwaway database on the server from Library.POSTGRES_URL."""
+    url = make_url(Library.POSTGRES_URL)
+    name = f"ts_test_{uuid4().hex}"
+    admin = create_engine(url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        conn.execute(text(f'CREATE DATABASE "{name}"'))
+    yield url.set(database=name).render_as_string(hide_password=False)
+    with admin.connect() as conn:
+        conn.execute(text(f'DROP DATABASE "{name}" WITH (FORCE)'))
+    admin.dispose()
+
+
 @pytest.fixture
 def search_library() -> Library:
     lib = Library()
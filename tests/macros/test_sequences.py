@@ -0,0 +1,200 @@
+import random
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from tagstudio.core.constants import TS_FOLDER_NAME
+from tagstudio.core.library.alchemy.library import Library
+from tagstudio.core.library.alchemy.models import Entry
+from tagstudio.core.utils.is_sequences import (
+    SEQUENCE_RE,
+    SequenceRegistry,
+    _split_frame,
+    update_sequences,
+)
+
+
+def expected_split(stem: str) -> tuple[str, str] | None:
+    match = SEQUENCE_RE.match(stem)
+    return match.groups() if match else None
+
+
+@pytest.mark.parametrize(
+    "stem",
+    [
+        "shot_0001",
+        "shot.0001",
+        "shot-0001",
+        "shot0001",
+        "shot__0001",
+        "shot_v2.1001",
+        "plate1234567",
+        "plate_1234567",
+        "0001",
+        "1234567890",
+        "_0001",
+        "001",
+        "01",
+        "shot_01",
+        "shot",
+        "",
+        "shot_١٢٣٤",
+        "shot_12٣456",
+    ],
+)
+def test_split_frame_matches_sequence_re(stem: str):
+    assert _split_frame(stem) == expected_split(stem)
+
+
+def test_split_frame_matches_sequence_re_random():
+    rng = random.Random(0)
+    alphabet = "ab._-0123456789٣"
+    for _ in range(10_000):
+        stem = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+        assert _split_frame(stem) == expected_split(stem), stem
+
+
+def open_library(request: pytest.FixtureRequest, library_dir: Path, backend: str) -> Library:
+    if backend == "sqlite":
+        storage = ":memory:"
+    else:
+        storage = request.getfixturevalue("postgres_storage")
+        (library_dir / TS_FOLDER_NAME).mkdir(parents=True)
+
+    lib = Library()
+    status = lib.open_library(library_dir, storage)
+    assert status.success
+    return lib
+
+
+def add_paths(lib: Library, paths: list[str]) -> None:
+    # the first batch also inserts lib.folder, which add_entries does by cascade
+    assert lib.add_entries([Entry(path=Path(p), folder=lib.folder, fields=[]) for p in paths])
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def backend_library(request: pytest.FixtureRequest, tmp_path: Path) -> Iterator[Library]:
+    lib = open_library(request, tmp_path, request.param)
+    yield lib
+    lib.close()
+
+
+@pytest.fixture
+def sequence_library(backend_library: Library) -> Library:
+    add_paths(
+        backend_library,
+        [
+            # mixed separators share the base "shot"
+            "shots/a/shot_0001.exr",
+            "shots/a/shot.0002.exr",
+            "shots/a/shot-0003.exr",
+            "shots/a/shot0004.exr",
+            # suffix is stored lower-case, so .EXR and .exr frames group together
+            "plates/plate_0001.EXR",
+            "plates/plate_0002.exr",
+            # same base in different folders is not a sequence
+            "a/frame_0001.png",
+            "b/frame_0002.png",
+            # same base with different suffixes is not a sequence
+            "c/frame_0001.png",
+            "c/frame_0002.jpg",
+            # not an image sequence extension
+            "docs/notes_0001.txt",
+            "docs/notes_0002.txt",
+            # no frame number
+            "misc/cover.png",
+            "misc/poster.png",
+        ],
+    )
+    return backend_library
+
+
+def flagged_paths(lib: Library) -> set[str]:
+    with Session(lib.engine) as session:
+        return {
+            path.as_posix()
+            for path in session.scalars(select(Entry.path).where(Entry.is_sequence.is_(True)))
+        }
+
+
+def set_stale_flag(lib: Library, path: str) -> None:
+    with Session(lib.engine) as session:
+        session.execute(update(Entry).where(Entry.path == Path(path)).values(is_sequence=True))
+        session.commit()
+
+
+def sequence_groups(lib: Library) -> set[tuple[str, ...]]:
+    registry = SequenceRegistry(lib)
+    registry.refresh_sequences()
+
+    for seq in registry.sequences:
+        assert seq.poster == seq.entries[0]
+        assert seq.frame_count == len(seq.entries)
+        for frame in seq.entries:
+            assert registry.entry_to_sequence[frame.id] is seq
+
+    return {tuple(e.path for e in seq.entries) for seq in registry.sequences}
+
+
+def test_refresh_sequences(sequence_library: Library):
+    assert sequence_groups(sequence_library) == {
+        (
+            "shots/a/shot-0003.exr",
+            "shots/a/shot.0002.exr",
+            "shots/a/shot0004.exr",
+            "shots/a/shot_0001.exr",
+        ),
+        ("plates/plate_0001.EXR", "plates/plate_0002.exr"),
+    }
+
+
+def test_refresh_sequences_backends_agree(request: pytest.FixtureRequest, tmp_path: Path):
+    rng = random.Random(0)
+    paths = {
+        "{}/{}{}{}.{}".format(
+            rng.choice(["a", "a/b", "c"]),
+            rng.choice(["shot", "Shot", "v2", "9", ""]),
+            rng.choice(["", ".", "_", "-", "__"]),
+            "".join(rng.choice("0123456789") for _ in range(rng.randint(1, 8))),
+            rng.choice(["exr", "EXR", "png", "tif", "txt"]),
+        )
+        for _ in range(500)
+    }
+
+    groups = {}
+    for backend in ("sqlite", "postgresql"):
+        lib = open_library(request, tmp_path / backend, backend)
+        add_paths(lib, sorted(paths))
+        groups[backend] = sequence_groups(lib)
+        lib.close()
+
+    assert groups["sqlite"]
+    assert groups["sqlite"] == groups["postgresql"]
+
+
+def test_update_sequences(sequence_library: Library):
+    non_posters = {
+        "shots/a/shot.0002.exr",
+        "shots/a/shot0004.exr",
+        "shots/a/shot_0001.exr",
+        "plates/plate_0002.exr",
+    }
+
+    update_sequences(sequence_library)
+    assert flagged_paths(sequence_library) == non_posters
+
+    # a stale flag on a file that is not a frame is cleared on the next run
+    set_stale_flag(sequence_library, "misc/cover.png")
+    update_sequences(sequence_library)
+    assert flagged_paths(sequence_library) == non_posters
+
+
+def test_update_sequences_without_sequences(backend_library: Library):
+    add_paths(backend_library, ["a/frame_0001.png", "b/frame_0002.png", "misc/cover.png"])
+    set_stale_flag(backend_library, "a/frame_0001.png")
+
+    update_sequences(backend_library)
+    assert flagged_paths(backend_library) == set()
@@ -2,8 +2,11 @@ from pathlib import Path
 from tempfile import TemporaryDirectory
 
 import pytest
+from sqlalchemy import Engine, event, text
 
+from tagstudio.core.constants import TS_FOLDER_NAME
 from tagstudio.core.enums import DefaultEnum, LibraryPrefs
+from tagstudio.core.library.alchemy.db import POSTGRES_SEARCH_INDEXES, SEARCH_INDEXES
 from tagstudio.core.library.alchemy.enums import BrowsingState
 from tagstudio.core.library.alchemy.fields import TextField, _FieldID
 from tagstudio.core.library.alchemy.library import Library
@@ -159,6 +162,61 @@ def test_entries_count(library: Library):
     assert len(results) == 5
 
 
+def test_add_entries_bulk_insert(tmp_path: Path):
+    lib = Library()
+    assert lib.open_library(tmp_path, ":memory:").success
+
+    # the first batch inserts lib.folder by cascade, later batches take the bulk INSERT path
+    assert lib.add_entries([Entry(path=Path("seed.txt"), folder=lib.folder, fields=[])])
+
+    entries = [Entry(path=Path(f"bulk/{x}.png"), folder=lib.folder, fields=[]) for x in range(50)]
+    new_ids = lib.add_entries(entries)
+
+    assert new_ids == [entry.id for entry in entries]
+    for entry_id, entry in zip(new_ids, entries, strict=True):
+        stored = lib.get_entry(entry_id)
+        assert stored is not None
+        assert stored.path == entry.path
+        assert stored.is_sequence is False
+
+    duplicate = Entry(path=Path("bulk/0.png"), folder=lib.folder, fields=[])
+    assert lib.add_entries([duplicate]) == []
+
+
+def test_search_indexes_created_once(postgres_storage: str, tmp_path: Path):
+    (tmp_path / TS_FOLDER_NAME).mkdir()
+    lib = Library()
+    assert lib.open_library(tmp_path, postgres_storage).success
+
+    with lib.engine.connect() as conn:
+        indexes = set(conn.scalars(text("SELECT indexname FROM pg_indexes")))
+        has_pg_trgm = conn.scalar(
+            text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+        )
+    lib.close()
+
+    assert indexes >= SEARCH_INDEXES.keys()
+    if has_pg_trgm:
+        assert indexes >= POSTGRES_SEARCH_INDEXES.keys()
+
+    # reopening the library must not issue any DDL
+    statements: list[str] = []
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record_statement)
+    try:
+        lib = Library()
+        assert lib.open_library(tmp_path, postgres_storage).success
+        lib.close()
+    finally:
+        event.remove(Engine, "before_cursor_execute", record_statement)
+
+    assert statements
+    assert not [s for s in statements if s.lstrip().upper().startswith(("CREATE", "ALTER"))]
+
+
 def test_parents_add(library: Library, generate_tag):
     # Given
     tag: Tag | None = library.tags[0]